@@ -1,17 +1,21 @@
 import os
 import shelve
+import heapq
 
 from threading import Thread, RLock
 from queue import Queue, Empty
 
 from utils import get_logger, get_urlhash, normalize
 from scraper import is_valid
+from crawler.linkgraph import LinkGraph
 
 class Frontier(object):
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
         self.to_be_downloaded = list()
+        self.push_count = 0
+        self.completed_count = 0
         
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
@@ -25,6 +29,8 @@ class Frontier(object):
             os.remove(self.config.save_file)
         # Load existing save file, or create one if it does not exist.
         self.save = shelve.open(self.config.save_file)
+        # Only resume the link graph when there is frontier state to resume.
+        self.link_graph = LinkGraph(config, restart or not self.save)
         if restart:
             for url in self.config.seed_urls:
                 self.add_url(url)
@@ -41,7 +47,7 @@ class Frontier(object):
         tbd_count = 0
         for url, completed in self.save.values():
             if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
+                self._push_url(url)
                 tbd_count += 1
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
@@ -49,7 +55,7 @@ class Frontier(object):
 
     def get_tbd_url(self):
         try:
-            return self.to_be_downloaded.pop()
+            return heapq.heappop(self.to_be_downloaded)[2]
         except IndexError:
             return None
 
@@ -59,7 +65,25 @@ class Frontier(object):
         if urlhash not in self.save:
             self.save[urlhash] = (url, False)
             self.save.sync()
-            self.to_be_downloaded.append(url)
+            self._push_url(url)
+
+    def _push_url(self, url):
+        # Highest score first. Urls not ranked yet score 0 and queue up
+        # behind every ranked url. Ties go to the newest url, as with the
+        # plain list this replaces.
+        heapq.heappush(
+            self.to_be_downloaded,
+            (-self.link_graph.score(url), -self.push_count, url))
+        self.push_count += 1
+
+    def add_outlinks(self, url, links):
+        self.link_graph.add_links(url, links)
+
+    def _order_by_rank(self):
+        self.to_be_downloaded = [
+            (-self.link_graph.score(url), seq, url)
+            for _, seq, url in self.to_be_downloaded]
+        heapq.heapify(self.to_be_downloaded)
     
     def mark_url_complete(self, url):
         urlhash = get_urlhash(url)
@@ -70,3 +94,12 @@ class Frontier(object):
 
         self.save[urlhash] = (url, True)
         self.save.sync()
+
+        self.completed_count += 1
+        if self.completed_count % self.config.rank_interval == 0:
+            self.link_graph.pagerank()
+            self._order_by_rank()
+
+    def close(self):
+        # Rank and save the final, possibly partial, interval of the crawl.
+        self.link_graph.close()
\ No newline at end of file
@@ -0,0 +1,212 @@
+import os
+
+from array import array
+from threading import RLock
+
+import numpy as np
+
+from utils import get_logger, get_urlhash, normalize
+
+class LinkGraph(object):
+    ''' Records the crawled link graph and ranks its pages with PageRank.
+
+    Every url gets an integer node id the first time its urlhash is seen.
+    New edges are appended to two array-backed buffers and periodically
+    compacted into a deduplicated CSR adjacency (indptr, indices) that is
+    saved to disk together with the node urls and the latest scores.
+    Nodes and edges added since the last save are also appended to two
+    log files, so they survive a crash and are replayed on resume. '''
+
+    def __init__(self, config, restart):
+        self.logger = get_logger("LINKGRAPH")
+        self.config = config
+        self.lock = RLock()
+        self.node_ids = dict()
+        self.urls = list()
+        self.edge_src = array("q")
+        self.edge_dst = array("q")
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0, dtype=np.float64)
+        self.node_log_file = f"{self.config.graph_file}.nodes"
+        self.edge_log_file = f"{self.config.graph_file}.edges"
+
+        graph_files = (
+            self.config.graph_file, self.node_log_file, self.edge_log_file)
+        replayed = False
+        if restart:
+            for graph_file in graph_files:
+                if os.path.exists(graph_file):
+                    self.logger.info(
+                        f"Found graph file {graph_file}, deleting it.")
+                    os.remove(graph_file)
+        else:
+            if os.path.exists(self.config.graph_file):
+                self._load_graph_file()
+            replayed = self._replay_logs()
+        self.node_log = open(self.node_log_file, "ab")
+        self.edge_log = open(self.edge_log_file, "ab")
+        if replayed:
+            # Saving truncates the logs, so a cut-off record left behind
+            # by a crash can not corrupt the records appended after it.
+            self.save()
+
+    def _load_graph_file(self):
+        with np.load(self.config.graph_file) as data:
+            url_bytes = data["url_bytes"].tobytes()
+            url_offsets = data["url_offsets"]
+            self.indptr = data["indptr"]
+            self.indices = data["indices"]
+            self.scores = data["scores"]
+        self.urls = [
+            url_bytes[start:end].decode("utf-8")
+            for start, end in zip(url_offsets[:-1], url_offsets[1:])]
+        for node_id, url in enumerate(self.urls):
+            self.node_ids[get_urlhash(url)] = node_id
+        self.logger.info(
+            f"Loaded link graph with {len(self.urls)} nodes and "
+            f"{len(self.indices)} edges.")
+
+    def _replay_logs(self):
+        ''' Re-adds the nodes and edges logged after the last save. A record
+        cut short by a crash is dropped, and entries that already made it
+        into the graph file are skipped or deduplicated on compaction.
+        Returns whether either log had anything in it. '''
+        replayed = False
+        if os.path.exists(self.node_log_file):
+            with open(self.node_log_file, "rb") as node_log:
+                data = node_log.read()
+            replayed = bool(data)
+            lines = data.split(b"\n")
+            # The last element is either empty or an unterminated record.
+            for line in lines[:-1]:
+                self._add_node(line.decode("utf-8"))
+        if os.path.exists(self.edge_log_file):
+            edges = np.fromfile(self.edge_log_file, dtype=np.int64)
+            replayed = replayed or os.path.getsize(self.edge_log_file) > 0
+            edges = edges[:len(edges) // 2 * 2].reshape(-1, 2)
+            edges = edges[((edges >= 0) & (edges < len(self.urls))).all(axis=1)]
+            self.edge_src.extend(edges[:, 0].tolist())
+            self.edge_dst.extend(edges[:, 1].tolist())
+            if len(edges):
+                self.logger.info(
+                    f"Replayed {len(edges)} edges from {self.edge_log_file}.")
+        return replayed
+
+    def _add_node(self, url):
+        urlhash = get_urlhash(url)
+        node_id = self.node_ids.get(urlhash)
+        if node_id is None:
+            node_id = len(self.urls)
+            self.node_ids[urlhash] = node_id
+            self.urls.append(url)
+            return node_id, True
+        return node_id, False
+
+    def get_node_id(self, url):
+        with self.lock:
+            url = normalize(url)
+            node_id, added = self._add_node(url)
+            if added:
+                self.node_log.write(url.encode("utf-8") + b"\n")
+            return node_id
+
+    def add_links(self, url, links):
+        with self.lock:
+            src = self.get_node_id(url)
+            edges = array("q")
+            for link in links:
+                dst = self.get_node_id(link)
+                self.edge_src.append(src)
+                self.edge_dst.append(dst)
+                edges.extend((src, dst))
+            # Nodes must be on disk before the edges that refer to them.
+            self.node_log.flush()
+            edges.tofile(self.edge_log)
+            self.edge_log.flush()
+
+    def score(self, url):
+        ''' PageRank of url from the last computation, 0 if not ranked yet. '''
+        node_id = self.node_ids.get(get_urlhash(normalize(url)))
+        if node_id is None or node_id >= len(self.scores):
+            return 0.0
+        return float(self.scores[node_id])
+
+    def compact(self):
+        ''' Merges the buffered edges into the CSR adjacency. '''
+        with self.lock:
+            n = len(self.urls)
+            if not self.edge_src and len(self.indptr) == n + 1:
+                return
+            old_src = np.repeat(
+                np.arange(len(self.indptr) - 1, dtype=np.int64),
+                np.diff(self.indptr))
+            src = np.concatenate((old_src, np.frombuffer(self.edge_src, dtype=np.int64)))
+            dst = np.concatenate((self.indices, np.frombuffer(self.edge_dst, dtype=np.int64)))
+            # Sorting the combined key orders edges by source and drops duplicates.
+            keys = np.unique(src * n + dst)
+            src, self.indices = np.divmod(keys, n)
+            self.indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+            self.edge_src = array("q")
+            self.edge_dst = array("q")
+
+    def pagerank(self, damping=0.85, tol=1e-6, max_iter=100):
+        ''' Power iteration warm-started from the previous scores, so each
+        periodic run only has to absorb what changed since the last one. '''
+        with self.lock:
+            self.compact()
+            n = len(self.urls)
+            if n == 0:
+                return self.scores
+            src = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr))
+            out_degree = np.diff(self.indptr).astype(np.float64)
+            dangling = out_degree == 0
+            rank = np.full(n, 1.0 / n)
+            rank[:len(self.scores)] = self.scores
+            rank /= rank.sum()
+            for iteration in range(max_iter):
+                share = np.divide(
+                    rank, out_degree, out=np.zeros(n), where=~dangling)
+                new_rank = np.bincount(
+                    self.indices, weights=share[src], minlength=n)
+                new_rank = (damping * (new_rank + rank[dangling].sum() / n)
+                            + (1 - damping) / n)
+                delta = np.abs(new_rank - rank).sum()
+                rank = new_rank
+                if delta < tol:
+                    break
+            self.scores = rank
+            self.logger.info(
+                f"PageRank over {n} nodes and {len(self.indices)} edges "
+                f"converged to {delta:.2e} after {iteration + 1} iterations.")
+            self.save()
+            return self.scores
+
+    def save(self):
+        ''' Writes the compacted graph and scores for offline analysis. The
+        urls are stored CSR style too: one utf-8 buffer plus offsets. '''
+        with self.lock:
+            self.compact()
+            encoded = [url.encode("utf-8") for url in self.urls]
+            url_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum(
+                np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)),
+                out=url_offsets[1:])
+            tmp_file = f"{self.config.graph_file}.tmp.npz"
+            np.savez(
+                tmp_file,
+                url_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                url_offsets=url_offsets, indptr=self.indptr,
+                indices=self.indices, scores=self.scores)
+            os.replace(tmp_file, self.config.graph_file)
+            # Everything logged so far is now in the graph file.
+            for log in (self.node_log, self.edge_log):
+                log.seek(0)
+                log.truncate()
+
+    def close(self):
+        with self.lock:
+            self.pagerank()
+            self.node_log.close()
+            self.edge_log.close()
@@ -2,7 +2,7 @@ from threading import Thread
 from urllib.parse import urlparse
 from inspect import getsource
 from utils.download import download
-from utils import get_logger
+from utils import get_logger, normalize
 import scraper
 import time, random
 
@@ -44,6 +44,11 @@ class Worker(Thread):
                 scraped_urls = scraper.scraper(tbd_url, resp)
                 for scraped_url in scraped_urls:
                     self.frontier.add_url(scraped_url)
+                # The scraper extracts links from the page after redirects.
+                final_url = scraper.handle_redirects(resp)
+                if normalize(final_url) != normalize(tbd_url):
+                    self.frontier.add_outlinks(tbd_url, [final_url])
+                self.frontier.add_outlinks(final_url, scraped_urls)
                 self.frontier.mark_url_complete(tbd_url)
             else:
                 self.logger.error(f"Failed to download or process URL {tbd_url}, status might be <{getattr(resp, 'status', 'None')}>.")
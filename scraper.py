@@ -314,8 +314,8 @@ def handle_redirects(resp):
     Returns:
         str: The final URL after following all redirects.
     """
-    if 300 <= resp.status < 400:
-        redirected_url = resp.headers.get('Location', '')
+    if 300 <= resp.status < 400 and resp.raw_response:
+        redirected_url = resp.raw_response.headers.get('Location', '')
         if redirected_url:
             return urljoin(resp.url, redirected_url)
     return resp.url
@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crawler.linkgraph import LinkGraph
+
+A = "https://www.ics.uci.edu/a"
+B = "https://www.ics.uci.edu/b"
+C = "https://www.ics.uci.edu/c"
+D = "https://www.ics.uci.edu/d"
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    # get_logger writes to Logs/ in the working directory.
+    monkeypatch.chdir(tmp_path)
+    return SimpleNamespace(graph_file=str(tmp_path / "linkgraph.npz"))
+
+
+def test_compact_merges_and_dedups(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B, C, C])
+    graph.add_links(B + "/", [C])
+    graph.compact()
+    assert graph.urls == [A, B, C]
+    assert graph.indptr.tolist() == [0, 2, 3, 3]
+    assert graph.indices.tolist() == [1, 2, 2]
+
+    graph.add_links(C, [A, D])
+    graph.add_links(A, [B])
+    graph.compact()
+    assert graph.urls == [A, B, C, D]
+    assert graph.indptr.tolist() == [0, 2, 3, 5, 5]
+    assert graph.indices.tolist() == [1, 2, 2, 0, 3]
+
+
+def test_pagerank(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B, C])
+    graph.add_links(B, [C])
+    graph.add_links(C, [A, D])
+    scores = graph.pagerank()
+    assert scores.sum() == pytest.approx(1.0)
+    assert graph.score(C) == scores.max()
+    assert graph.score(A) == pytest.approx(graph.score(D))
+    assert graph.score("https://www.ics.uci.edu/unknown") == 0.0
+
+
+def test_save_load_round_trip(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B, C])
+    graph.add_links(C, [A])
+    graph.pagerank()
+
+    loaded = LinkGraph(config, False)
+    assert loaded.urls == graph.urls
+    assert loaded.indptr.tolist() == graph.indptr.tolist()
+    assert loaded.indices.tolist() == graph.indices.tolist()
+    assert loaded.scores.tolist() == graph.scores.tolist()
+    assert loaded.get_node_id(C) == 2
+
+
+def test_unsaved_links_are_replayed(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B])
+    graph.pagerank()
+    # Links added after the last save, then the process dies.
+    graph.add_links(B, [C, A])
+
+    resumed = LinkGraph(config, False)
+    assert resumed.urls == [A, B, C]
+    assert resumed.indptr.tolist() == [0, 1, 3, 3]
+    assert resumed.indices.tolist() == [1, 0, 2]
+
+
+def test_restart_deletes_graph(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B])
+    graph.pagerank()
+
+    fresh = LinkGraph(config, True)
+    assert fresh.urls == []
+    assert len(fresh.indices) == 0
+
+
+def test_cut_off_records_are_discarded(config):
+    graph = LinkGraph(config, True)
+    graph.add_links(A, [B])
+    graph.pagerank()
+    graph.node_log.close()
+    graph.edge_log.close()
+    # A crash midway through writing a node and an edge.
+    with open(graph.node_log_file, "ab") as node_log:
+        node_log.write(b"https://www.ics.uci.edu/z")
+    with open(graph.edge_log_file, "ab") as edge_log:
+        edge_log.write(bytes(12))
+
+    resumed = LinkGraph(config, False)
+    assert resumed.urls == [A, B]
+    resumed.add_links(C, [D])
+
+    resumed_again = LinkGraph(config, False)
+    assert resumed_again.urls == [A, B, C, D]
+    assert resumed_again.indptr.tolist() == [0, 1, 1, 2, 2]
+    assert resumed_again.indices.tolist() == [1, 3]
@@ -9,11 +9,14 @@ class Config(object):
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        self.graph_file = config["LOCAL PROPERTIES"].get("GRAPH", "linkgraph.npz")
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        self.rank_interval = int(config["CRAWLER"].get("RANKINTERVAL", "500"))
+        assert self.rank_interval >= 1, "RANKINTERVAL should be at least 1"
 
         self.cache_server = None
\ No newline at end of file